@@ -1,3 +1,12 @@
+import copy
+import functools
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 
@@ -7,25 +16,156 @@ import pandas as pd
 ###                                  [2] https://en.wikipedia.org/wiki/Flow_Cytometry_Standard
 #######################################################################################################################
 
+# Parsed HEADER and $TEXT metadata of recently opened FCS files, keyed on (path, mtime, size, sample_number)
+# Re-opening an unchanged file restores these attributes instead of parsing its $TEXT segment(s) all over again
+# Ordered from least to most recently used, so the entry evicted when full is the one unused for longest
+_METADATA_CACHE = OrderedDict()
+_METADATA_CACHE_SIZE = 256
+# convertAllFCS, convertAllDF and convertManyFCS read and fill the cache from several threads at once
+_METADATA_CACHE_LOCK = threading.Lock()
+_METADATA_ATTRIBUTES = (
+    "data_start",
+    "data_end",
+    "channel_names",
+    "channel_nums",
+    "channel_bits",
+    "text_keywords",
+    "byte_order",
+)
+
+
+def _read_header_offsets(buffer, data_offset=0):
+    """
+    Reads the byte offsets of the $TEXT and $DATA segments from the HEADER of the data set at data_offset
+    :param buffer: bytes-like contents of the FCS file
+    :param data_offset: byte offset for the HEADER segment itself
+    :return: tuple of byte offsets ($BEGINSTEXT, $ENDSTEXT, $BEGINDATA, $ENDDATA) relative to data_offset
+    """
+    # Slice the whole HEADER out of the buffer in one go, then slice the offsets out of it
+    header = bytes(buffer[data_offset : data_offset + 58])
+    # Ignore first 10 bytes of HEADER contain FCS file format followed by 4 spaces
+    # Each byte offset that follows is an ASCII integer right-justified in 8 bytes
+    return tuple(int(header[10 + i * 8 : 18 + i * 8]) for i in range(4))
+
+
+def _advise_data(fcs, data_start, data_length, advice):
+    """
+    Passes a posix_fadvise hint about how the $DATA segment will be accessed to the kernel, where the platform supports it
+    :param fcs: FCS file object
+    :param data_start: byte offset of the $DATA segment
+    :param data_length: length of the $DATA segment in bytes
+    :param advice: suffix of an os.POSIX_FADV_* constant, e.g. 'SEQUENTIAL' or 'DONTNEED'
+    :return: None
+    """
+    advice = getattr(os, f"POSIX_FADV_{advice}", None)
+    if hasattr(os, "posix_fadvise") and advice is not None:
+        os.posix_fadvise(fcs.fileno(), data_start, data_length, advice)
+
+
+# Channel keywords of the FCS standard, $PnX, where n is the channel number and X the kind of keyword e.g. 'N' or 'B'
+_CHANNEL_KEYWORD = re.compile(r"\$P(\d+)([A-Z]+)")
+
+# Distinct data layouts ($DATATYPE, $BYTEORD and $PnB widths) are far fewer than files, so a small memo covers them
+_DATA_DTYPES_CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=_DATA_DTYPES_CACHE_SIZE)
+def _data_dtypes(datatype, byte_order, channel_bits):
+    """
+    Builds the NumPy dtypes describing one event of a $DATA segment, memoized per data layout
+    :param datatype: $DATATYPE keyword of the data set
+    :param byte_order: NumPy byte order character parsed from $BYTEORD
+    :param channel_bits: tuple of bits reserved for each channel from $PnB
+    :return: tuple of (structured dtype with one field per channel named by position i.e. 'f0', 'f1', ..., shared channel dtype or None if channel widths differ)
+    """
+    # FCS $DATATYPE keyword uses $DATATYPE='D' or $DATATYPE='F' to refer to floats, and $DATATYPE='I' to integers
+    # We can use a dictionary in a clever way to convert the FCS datatypes to NumPy compatible dtypes, like so:
+    param_dtype = {"I": "u", "D": "f", "F": "f"}[datatype]
+    # Prefix each dtype with the $BYTEORD endianness so NumPy never needs to byteswap the data afterwards
+    # $PnB is in bits, so bits to bytes is a shift rather than a float division
+    parameter_data_dtypes = [
+        np.dtype(f"{byte_order}{param_dtype}{parameter_bits >> 3}")
+        for parameter_bits in channel_bits
+    ]
+    # Record fields may have different widths, so channels with mixed $PnB (e.g. a 32-bit time channel) parse in one pass
+    # Fields are named by position rather than $PnN, since files may repeat a channel name and NumPy rejects duplicate field names
+    record_dtype = np.dtype(
+        [(f"f{i}", dtype) for i, dtype in enumerate(parameter_data_dtypes)]
+    )
+    # When all channels share a dtype, the records can also be viewed as a plain 2D array
+    data_dtype = (
+        parameter_data_dtypes[0] if len(set(parameter_data_dtypes)) == 1 else None
+    )
+    return record_dtype, data_dtype
+
+
+def _split_text_segment(text, delim):
+    """
+    Splits the raw bytes of a $TEXT segment into its keys and values
+    Double delimiters are literal (escaped) delimiters and are unescaped in the returned tokens
+    :param text: bytes of the $TEXT segment following its leading delimiter
+    :param delim: single-byte delimiter of the $TEXT segment
+    :return: list of bytes tokens alternating between keys and values
+    """
+    # To avoid misinterpreting escaped delimiters as actual delimiters, we should split the text on double (escaped) delimiters first, followed by splitting on actual delimiters
+    # bytes.split runs in C, so this beats a single regex scan even though it takes two passes
+    text_segment_sublists = [
+        segment.split(delim) for segment in text[:-1].split(delim * 2)
+    ]
+
+    # Start the list of text segments with the first sublist, then extend it for each successive sublist
+    text_segments = text_segment_sublists[0]
+    # Now combine adjacent sublists (produced by double delimiters) back into whole text segments
+    for segment_sublist in text_segment_sublists[1:]:
+        text_segments[-1] += delim + segment_sublist[0]
+        text_segments.extend(segment_sublist[1:])
+    return text_segments
+
 
 class convertFCS:
     """
     Contains methods and attributes to read and hold data from an FCS file
 
     Params:
-    fcs: string: Path to FCS file
+    fcs: string: Path to FCS file, or bytes-like contents of an FCS file already in memory (see convertFCS.from_buffer)
     An FCS file may be a wrapper around multiple other FCS files in an experiment with multiple samples
     sample_number: int: Specifies the current FCS file/experiment sample being converted from a multi-sample experiment
+    data_offset: int: Optional byte offset of the sample's HEADER segment, if already known from convertFCS.locate_samples
 
     Vars:
     self.text_keywords: Dict: keys are parsed from $TEXT fields of FCS file and hold the data under each $TEXT field
 
     self.data: NumPy ndarray[total number of events, number of channels/parameters]: Contains data from $BEGINDATA to $ENDDATA section of FCS file
+    Channels with differing $PnB widths are upcast to a common dtype when self.data is first accessed
+    self.records: NumPy structured ndarray[total number of events]: Same data as self.data with one field per channel, named by position i.e. 'f0', 'f1', ...
+    self.columns: Dict: keys are channel names and values are 1D views of each channel's data in self.records
+    If a channel name is repeated in $PnN, self.columns holds only its first channel; the others remain in self.records and self.data
     self.channel_names: Contains the names of the scattering and fluorescence channels included in the experiment run
+    self.channel_bits: Contains the number of bits reserved for each channel's data ($PnB)
     """
 
-    def __init__(self, fcs, sample_number):
-        self.data = None
+    # Batch pipelines may hold thousands of these at once, so skip the per-instance __dict__
+    __slots__ = (
+        "_buffer",
+        "_path",
+        "_file_stat",
+        "_data",
+        "records",
+        "columns",
+        "channel_name",
+        "data_start",
+        "data_end",
+        "channel_names",
+        "channel_nums",
+        "channel_bits",
+        "text_keywords",
+        "byte_order",
+    )
+
+    def __init__(self, fcs, sample_number, data_offset=None):
+        self._data = None
+        self.records = None
+        self.columns = {}
         # Default FCS standard uses '$PnN' to refer to (short) names of acquisition channels
         self.channel_name = "$PnN"
 
@@ -34,24 +174,161 @@ class convertFCS:
         self.data_end = -1
         self.channel_names = []
         self.channel_nums = []
+        self.channel_bits = []
         self.text_keywords = {}
+        # NumPy byte order character ('<' little-endian or '>' big-endian) parsed from $BYTEORD
+        self.byte_order = "<"
 
-        self.fcs = fcs
+        if isinstance(fcs, (bytes, bytearray, memoryview)):
+            # FCS file contents are already in memory, so there is no file to open or to cache metadata for
+            self._path = None
+            self._file_stat = None
+            # Wrap read-only, so self.data cannot be written through even when the buffer is e.g. a bytearray
+            self._buffer = memoryview(fcs).toreadonly()
+            self.load(sample_number, data_offset)
+            return
+
+        self._path = os.path.abspath(fcs)
+        fcs_stat = os.stat(fcs)
+        # Identifies this version of the file, so stale cached metadata or pickles of a rewritten file can be detected
+        self._file_stat = (fcs_stat.st_mtime_ns, fcs_stat.st_size)
+        cache_key = (self._path, *self._file_stat, sample_number)
         with open(fcs, "rb") as fcs:
-            fcs.seek(0, 2)
-            fcs.seek(0)
-            data_segments = 0
-            # seek the correct data set in fcs
-            data_offset = 0
-            while data_segments <= sample_number:
-                self.read_header(fcs, data_offset)
-                self.read_text(fcs)
-                data_segments += 1
-                data_offset = self.text_keywords["$NEXTDATA"]
-                fcs.seek(data_offset)
-                self.read_data(fcs)
-
-    def read_header(self, fcs, data_offset=0):
+            # Map the whole file read-only so self.data can be a zero-copy view onto the $DATA segment
+            # The map outlives the file handle, and must be kept alive for as long as self.data is in use
+            self._buffer = mmap.mmap(fcs.fileno(), 0, access=mmap.ACCESS_READ)
+            self.load(sample_number, data_offset, cache_key)
+            # $DATA is read front to back, so ask the kernel to read ahead aggressively
+            _advise_data(fcs, self.data_start, self.records.nbytes, "SEQUENTIAL")
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self._buffer.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __getstate__(self):
+        """
+        Pickles the parsed HEADER and $TEXT attributes; a memory map cannot be pickled, so the file is re-mapped instead
+        Objects created from a buffer carry a copy of the buffer, since there is no file to re-map
+        :return: Dict of attributes to restore in __setstate__
+        """
+        state = {
+            attribute: getattr(self, attribute) for attribute in _METADATA_ATTRIBUTES
+        }
+        state["channel_name"] = self.channel_name
+        state["_path"] = self._path
+        state["_file_stat"] = self._file_stat
+        if self._path is None:
+            state["_buffer"] = bytes(self._buffer)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled convertFCS object, re-mapping its FCS file and re-viewing its $DATA
+        Raises ValueError if the FCS file was modified after the object was created, as its metadata would no longer apply
+        :param state: Dict of attributes returned by __getstate__
+        :return: None
+        """
+        for attribute, value in state.items():
+            setattr(self, attribute, value)
+        if self._path is None:
+            self._buffer = memoryview(self._buffer)
+        else:
+            with open(self._path, "rb") as fcs:
+                fcs_stat = os.fstat(fcs.fileno())
+                if (fcs_stat.st_mtime_ns, fcs_stat.st_size) != self._file_stat:
+                    raise ValueError(
+                        f"FCS file {self._path} has changed since this object was loaded from it"
+                    )
+                self._buffer = mmap.mmap(fcs.fileno(), 0, access=mmap.ACCESS_READ)
+        self.read_data()
+
+    @classmethod
+    def from_buffer(cls, buffer, sample_number=0, data_offset=None):
+        """
+        Creates a convertFCS object from the contents of an FCS file already in memory, e.g. fetched from remote storage
+        :param buffer: bytes-like contents of the FCS file; self.data is a view onto it, so it must not be modified
+        :param sample_number: FCS file/experiment sample to convert from a multi-sample experiment
+        :param data_offset: optional byte offset of the sample's HEADER segment, if already known
+        :return: convertFCS object
+        """
+        return cls(memoryview(buffer), sample_number, data_offset)
+
+    def load(self, sample_number, data_offset=None, cache_key=None):
+        """
+        Parses the HEADER and $TEXT segments of the requested sample from self._buffer, then reads its $DATA segment
+        :param sample_number: FCS file/experiment sample to convert from a multi-sample experiment
+        :param data_offset: optional byte offset of the sample's HEADER segment, if already known
+        :param cache_key: key of the parsed metadata in the module-level metadata cache, or None to skip caching
+        :return: None
+        """
+        metadata = None
+        if cache_key is not None:
+            with _METADATA_CACHE_LOCK:
+                metadata = _METADATA_CACHE.get(cache_key)
+                if metadata is not None:
+                    # Mark the entry as most recently used, so a file that keeps being reopened stays cached
+                    _METADATA_CACHE.move_to_end(cache_key)
+        if metadata is None:
+            # seek the correct data set in fcs; only that data set's $TEXT is parsed in full
+            if data_offset is None:
+                data_offset = self.locate_samples(self._buffer, sample_number)[
+                    sample_number
+                ]
+            self.read_header(self._buffer, data_offset)
+            self.read_text(self._buffer, data_offset)
+            if cache_key is not None:
+                self.cache_metadata(cache_key)
+        else:
+            # Copy cached containers so changes to this object never leak back into the cache
+            for attribute in _METADATA_ATTRIBUTES:
+                setattr(self, attribute, copy.copy(metadata[attribute]))
+        self.read_data()
+
+    def cache_metadata(self, cache_key):
+        """
+        Stores parsed HEADER and $TEXT attributes in the module-level metadata cache, evicting the least recently used entry if full
+        :param cache_key: tuple of (absolute path, mtime, size, sample_number) identifying the parsed FCS file
+        :return: None
+        """
+        metadata = {
+            attribute: copy.copy(getattr(self, attribute))
+            for attribute in _METADATA_ATTRIBUTES
+        }
+        # Evicting and inserting must happen together, or concurrent loads overgrow the cache and evict the same key twice
+        with _METADATA_CACHE_LOCK:
+            _METADATA_CACHE[cache_key] = metadata
+            _METADATA_CACHE.move_to_end(cache_key)
+            while len(_METADATA_CACHE) > _METADATA_CACHE_SIZE:
+                _METADATA_CACHE.popitem(last=False)
+
+    @staticmethod
+    def locate_samples(buffer, sample_number=None):
+        """
+        Follows the $NEXTDATA chain of a (multi-sample) FCS file to find the HEADER offset of each data set
+        Only the $NEXTDATA keyword is picked out of each $TEXT segment, so this is much cheaper than a full parse
+        :param buffer: bytes-like contents of the FCS file
+        :param sample_number: stop once this sample has been located; locate every sample if None
+        :return: list of byte offsets of each data set's HEADER segment, starting with 0
+        """
+        sample_offsets = [0]
+        while sample_number is None or len(sample_offsets) <= sample_number:
+            data_offset = sample_offsets[-1]
+            text_start, text_end, _, _ = _read_header_offsets(buffer, data_offset)
+            text = bytes(buffer[data_offset + text_start : data_offset + text_end + 1])
+            delim = re.escape(text[0:1])
+            next_data = re.search(
+                delim + rb"\$NEXTDATA" + delim + rb"\s*(\d+)\s*" + delim, text
+            )
+            # $NEXTDATA is the byte offset of the next data set relative to this one, or 0 for the last data set
+            if next_data is None or int(next_data[1]) == 0:
+                break
+            sample_offsets.append(data_offset + int(next_data[1]))
+
+        if sample_number is not None and len(sample_offsets) <= sample_number:
+            raise NameError(
+                f"Sample {sample_number} requested but FCS file only holds {len(sample_offsets)} samples"
+            )
+        return sample_offsets
+
+    def read_header(self, buffer, data_offset=0):
         """
         Records byte offsets locating data segments from the FCS file's HEADER segment
         HEADER: Dict: stores byte offsets for beginning and end of $TEXT and $DATA segments
@@ -62,100 +339,103 @@ class convertFCS:
         $ENDDATA Byte-offset to the end of the DATA segment.
         $ENDSTEXT Byte-offset to the end of a supplemental TEXT segment.
 
-        :param fcs: current byte offset position in FCS file
+        :param buffer: bytes-like contents of the FCS file
         :param data_offset: byte offset for the HEADER segment itself
         :return: None
         """
-        # Ignore first 10 bytes of HEADER contain FCS file format followed by 4 spaces
-        fcs.read(10)
-
-        for text in (
-            "$BEGINSTEXT",
-            "$ENDSTEXT",
-            "$BEGINDATA",
-            "$ENDDATA",
+        for text, text_offset in zip(
+            (
+                "$BEGINSTEXT",
+                "$ENDSTEXT",
+                "$BEGINDATA",
+                "$ENDDATA",
+            ),
+            _read_header_offsets(buffer, data_offset),
         ):
-            text_offset = int(fcs.read(8))
             self.text_keywords[text] = text_offset + data_offset
+            # The HEADER holds 0 for $DATA offsets that do not fit in its 8 bytes (beyond 99,999,999 bytes)
+            # Leave those at 0 so read_text takes them from the $TEXT keywords instead
+            if text == "$BEGINDATA":
+                self.data_start = text_offset + data_offset if text_offset else 0
+            elif text == "$ENDDATA":
+                self.data_end = text_offset + data_offset if text_offset else 0
 
-        self.data_start = self.text_keywords["$BEGINDATA"]
-        self.data_end = self.text_keywords["$BEGINDATA"]
-
-    def read_text(self, fcs):
+    def read_text(self, buffer, data_offset=0):
         """
         Extracts data from $BEGINSTEXT to $ENDSTEXT section of FCS file
-        :param fcs: current byte-offset position in FCS file
+        :param buffer: bytes-like contents of the FCS file
+        :param data_offset: byte offset for the HEADER segment of this data set, which $TEXT byte offsets are relative to
         :return: None
         """
-        fcs.seek(self.text_keywords["$BEGINSTEXT"], 0)
-        text = fcs.read(
-            self.text_keywords["$ENDSTEXT"] - self.text_keywords["$BEGINSTEXT"] + 1
+        text = bytes(
+            buffer[
+                self.text_keywords["$BEGINSTEXT"] : self.text_keywords["$ENDSTEXT"] + 1
+            ]
         )
-        text = text.decode(
-            encoding="utf-8"
-        )  # $TEXT keywords in the FCS standard are UTF-8 encoded
 
         # delimiters are sometimes used as escape chars in FCS files
-        # To avoid misinterpreting escaped delimiters as actual delimiters, we should split the text on double (escaped) delimiters first, followed by splitting on actual delimiters
-        # We record the data between the delimiters at either end of each text segment (text[1:-1])
+        # We record the data between the delimiters at either end of each text segment (text[1:])
+        # Splitting is done on the raw bytes so that only the final keys and values are ever decoded
         delim = text[
-            0
+            0:1
         ]  # text segments start with the delimiter used for the whole FCS file
-        text_segment_sublists = [
-            text.split(delim) for text in text[1:-1].split(delim * 2)
-        ]
+        text_segments = _split_text_segment(text[1:], delim)
 
-        # Start the list of text segments with the first sublist, then extend it for each successive sublist
-        text_segments = text_segment_sublists[0]
-        # Now combine adjacent sublists (produced by double delimiters) back into whole text segments
-        for segment_sublist in text_segment_sublists[1:]:
-            text_segments[-1] += delim + segment_sublist[0]
-            text_segments.extend(segment_sublist[1:])
         # In the now-flattened list text_keywords we have even elements as keys, and odd elements as values
-        keys, values = text_segments[0::2], text_segments[1::2]
+        # $TEXT keywords in the FCS standard are UTF-8 encoded
+        keys = [key.decode("utf-8", "replace") for key in text_segments[0::2]]
+        values = [value.decode("utf-8", "replace") for value in text_segments[1::2]]
         # Finally, convert raw text data to a dictionary and add it to our list of $TEXT data in self.text_keywords
         self.text_keywords.update(dict(zip(keys, values)))
 
-        # Don't forget to convert keys in self.text_keywords which encode bit values into integers
-        # $PnB is FCS standard for bits reserved for each parameter (channel)
-        bit_keys = [f"$P{i}B" for i in self.channel_nums]
-        bit_keys.extend(
-            ["$NEXTDATA", "$PAR", "$TOT"]
-        )  # These text keywords giving byte offsets are also encoded as bits
-        for key in bit_keys:
-            value = self.text_keywords[key]
-            self.text_keywords[key] = int(value)
-
         # Find how many flow acquisition channels were enabled (i.e. included parameters as in FCS standard)
         # $PAR: FCS standard keyword for parameters (channels) recorded for each event i.e. included channels numbers
         # Channel numbers start from 1 on the FACSAria, FACSCalibur, and Guava easyCyte flow cytometers (may not be true for other cytometer models/setups!)
         num_channels = int(self.text_keywords["$PAR"])
         self.channel_nums = range(1, num_channels + 1)
 
-        # Find names of acquisition channels from $PnN keyword (i.e. parameter names as in FCS standard)
-        self.channel_names = [self.text_keywords[f"$P{i}N"] for i in self.channel_nums]
+        # Sort the channel keywords $PnX (e.g. $PnN name, $PnB bits) into a table by channel number n in a single pass
+        channel_table = {}
+        for key, value in zip(keys, values):
+            channel_keyword = _CHANNEL_KEYWORD.fullmatch(key)
+            if channel_keyword is not None:
+                channel_num, kind = int(channel_keyword[1]), channel_keyword[2]
+                if kind == "B":
+                    # $PnB is FCS standard for bits reserved for each parameter (channel), so convert it to int
+                    value = self.text_keywords[key] = int(value)
+                channel_table.setdefault(channel_num, {})[kind] = value
+
+        # Find names of acquisition channels from $PnN keyword (i.e. parameter names as in FCS standard), and their $PnB bits
+        self.channel_names = [channel_table[i]["N"] for i in self.channel_nums]
+        self.channel_bits = [channel_table[i]["B"] for i in self.channel_nums]
 
         # Don't forget to convert keys in self.text_keywords which encode bit values into integers
-        # $PnB is FCS standard for bits reserved for each parameter (channel)
-        bit_keys = [f"$P{i}B" for i in self.channel_nums]
-        bit_keys.extend(
-            ["$NEXTDATA", "$PAR", "$TOT"]
+        self.text_keywords.update(
+            {key: int(self.text_keywords[key]) for key in ("$NEXTDATA", "$PAR", "$TOT")}
         )  # These text keywords giving byte offsets are also encoded as bits
-        for key in bit_keys:
-            value = self.text_keywords[key]
-            self.text_keywords[key] = int(value)
+
+        # $BYTEORD: FCS keyword for the byte order data was written in; '1,2,3,4' is little-endian, '4,3,2,1' is big-endian
+        byte_order = self.text_keywords["$BYTEORD"].replace(" ", "")
+        if byte_order in ("1,2,3,4", "1,2"):
+            self.byte_order = "<"
+        elif byte_order in ("4,3,2,1", "2,1"):
+            self.byte_order = ">"
+        else:
+            raise NameError(
+                f"Unsupported $BYTEORD {byte_order}; check instrument settings"
+            )
 
         ##### Update $BEGINDATA segments if needed
         if self.data_start == 0:
-            self.data_start = int(text["$BEGINDATA"])
+            self.data_start = int(self.text_keywords["$BEGINDATA"]) + data_offset
         if self.data_end == 0:
-            self.data_end = int(text["$ENDDATA"])
+            self.data_end = int(self.text_keywords["$ENDDATA"]) + data_offset
 
-    def read_data(self, fcs):
+    def read_data(self):
         """
-        Extracts data from $BEGINDATA to $ENDDATA section of FCS file and records to self.data 
-        :param fcs:
-        :return:
+        Extracts data from $BEGINDATA to $ENDDATA section of FCS file and records to self.data
+        self.data is a read-only view onto the memory-mapped FCS file (or in-memory buffer); no bytes are copied
+        :return: None
         """
         text = self.text_keywords
 
@@ -164,40 +444,214 @@ class convertFCS:
         # $PAR: FCS keyword for Parameters (channels) recorded for each event i.e. enabled channels in the experiment
         num_params = text["$PAR"]
 
-        # The following block attempts to catch an FCS file with mixed datatypes for different acquisition channels
-        # This should not be the case, but if it is - then this will prevent a corrupt output from a valid FCS file making its way into analysis
         # $PnB: FCS standard for number of ****BITS**** reserved for parameter number n i.e. for data recorded by each channel
-        reserved_bytes = [int(text[f"$P{i}B"] / 8) for i in self.channel_nums]
-        # FCS $DATATYPE keyword uses $DATATYPE='D' or $DATATYPE='F' to refer to floats, and $DATATYPE='I' to integers
-        # We can use a dictionary in a clever way to convert the FCS datatypes to NumPy compatible dtypes, like so:
-        param_dtype = {"I": "u", "D": "f", "F": "f"}[text["$DATATYPE"]]
-        parameter_data_dtypes = [
-            f"{param_dtype}{parameter_bytes}" for parameter_bytes in reserved_bytes
-        ]
-        if len(set(parameter_data_dtypes)) > 1:
-            raise NameError(
-                "Mixed data types across FCS channels; check instrument settings"
-            )
+        # Nearly every file shares one of a handful of layouts, so the NumPy dtypes for a layout are built once and reused
+        record_dtype, data_dtype = _data_dtypes(
+            text["$DATATYPE"],
+            self.byte_order,
+            tuple(self.channel_bits),
+        )
+
+        # View the memory map starting at $BEGINDATA; pages are only read in from disk as they are accessed
+        # Each event is a record with one field per channel, so a single channel can be viewed without copying the others
+        self.records = np.frombuffer(
+            self._buffer,
+            dtype=record_dtype,
+            count=num_events,
+            offset=self.data_start,
+        )
+        # Field views are not copies, so holding every channel as its own column costs nothing extra
+        self.columns = {}
+        for i, channel in enumerate(self.channel_names):
+            self.columns.setdefault(channel, self.records[f"f{i}"])
 
-        fcs.seek(self.data_start, 0)  # Go back to $BEGINDATA
+        # When all channels share a dtype the records can also be viewed as a 2D array without copying
+        # Otherwise self.data is only assembled from the records if and when it is accessed
+        self._data = None
+        if data_dtype is not None:
+            data = self.records.view(data_dtype)
+            data = data.reshape(num_events, num_params)
+            self._data = data
 
-        # Datatypes of all channels should be the same, so pick dtype from first channel
-        dtype = parameter_data_dtypes[0]
-        data = np.fromfile(fcs, dtype=dtype, count=num_events * num_params)
-        data = data.reshape(num_events, num_params)
-        self.data = data
+    @property
+    def data(self):
+        """
+        Data from $BEGINDATA to $ENDDATA section of FCS file as a 2D array of events x channels
+        Channels of mixed widths are stacked (and so copied) into a single array on first access
+        :return: NumPy ndarray[total number of events, number of channels/parameters]
+        """
+        if self._data is None and self.records is not None:
+            self._data = np.column_stack(
+                [self.records[field] for field in self.records.dtype.names]
+            )
+        return self._data
 
 
-def convertDF(fcs, sample_number=0):
+def convertDF(fcs, sample_number=0, channels=None, drop_page_cache=False):
     """
     Runs convertFCS to create an FCSdata object containing flow data from FCS file
     Converts data values and keys (channel names) to a PANDAS dataframe
     :param sample_number: number of samples represented in the FCS file 
+    :param channels: optional list of channel names to convert; only these channels are cast and copied into the dataframe
+    :param drop_page_cache: evict the $DATA segment from the OS page cache once converted, for files read only once
     :return: PANDAS dataframe object
     """
     # Create an FCSdata object holding data from the FCS file
     FCSdata = convertFCS(fcs, sample_number)
+    df = _fcs_to_df(FCSdata, channels)
+    if drop_page_cache and isinstance(fcs, (str, os.PathLike)):
+        # The DataFrame holds its own copy of the data, so batch pipelines can keep the page cache for other files
+        data_start, data_length = FCSdata.data_start, FCSdata.records.nbytes
+        # The kernel will not evict pages that are still mapped, so unmap the file before the hint is given
+        del FCSdata
+        with open(fcs, "rb") as fcs_file:
+            _advise_data(fcs_file, data_start, data_length, "DONTNEED")
+    return df
+
+
+def convertAllFCS(fcs, max_workers=None):
+    """
+    Runs convertFCS on every sample of a multi-sample FCS file, parsing samples concurrently
+    The samples are located in one cheap sequential pass, then each is parsed on its own thread with its own file handle
+    :param fcs: path to FCS file
+    :param max_workers: maximum number of threads; defaults to the ThreadPoolExecutor default
+    :return: list of convertFCS objects, one per sample in file order
+    """
+    with open(fcs, "rb") as fcs_file, mmap.mmap(
+        fcs_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        sample_offsets = convertFCS.locate_samples(buffer)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                functools.partial(convertFCS, fcs),
+                range(len(sample_offsets)),
+                sample_offsets,
+            )
+        )
+
+
+def convertManyFCS(paths, max_workers=8):
+    """
+    Runs convertFCS on the first sample of each of many FCS files, reading files concurrently
+    Paths with a protocol (e.g. 's3://bucket/experiment.fcs') are fetched into memory with fsspec, which must be installed
+    :param paths: list of paths or URLs of FCS files
+    :param max_workers: maximum number of files read at once
+    :return: list of convertFCS objects, one per path in order
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_read_fcs, paths))
+
+
+def _read_fcs(path):
+    """
+    Runs convertFCS on the first sample of a local FCS file, or of a remote FCS file fetched into memory
+    :param path: path or URL of FCS file
+    :return: convertFCS object
+    """
+    # pathlib.Path and other path-like objects are local paths, but str methods are needed to check for a URL
+    path = os.fspath(path)
+    if "://" not in path:
+        return convertFCS(path, 0)
+    # fsspec is only needed for remote paths, so it is imported here rather than required for all users
+    import fsspec
+
+    with fsspec.open(path, "rb") as fcs:
+        return convertFCS.from_buffer(fcs.read())
+
+
+def convertAllDF(fcs, max_workers=None, channels=None):
+    """
+    Runs convertAllFCS and converts every sample of a multi-sample FCS file to a PANDAS dataframe
+    :param fcs: path to FCS file
+    :param max_workers: maximum number of threads; defaults to the ThreadPoolExecutor default
+    :param channels: optional list of channel names to convert; only these channels are cast and copied into the dataframe
+    :return: list of PANDAS dataframe objects, one per sample in file order
+    """
+    return [
+        _fcs_to_df(FCSdata, channels) for FCSdata in convertAllFCS(fcs, max_workers)
+    ]
+
+
+def _stack_columns(columns, num_events, dtype, data=None):
+    """
+    Casts channels into a single 2D array, one column per channel
+    :param columns: list of (channel name, 1D NumPy array) pairs
+    :param num_events: number of events in each channel
+    :param dtype: NumPy integer dtype of the returned array
+    :param data: optional 2D array already holding exactly these columns, e.g. convertFCS.data
+    :return: NumPy ndarray[number of events, number of channels]
+    """
+    if data is not None:
+        # A contiguous 2D array casts in one pass, far faster than gathering each strided record field
+        # PANDAS keeps the transpose of the (row-major) result as its block, which is a view rather than a copy
+        return data.astype(dtype)
+    # Otherwise PANDAS stores each block transposed, so a column-major 2D array becomes its single block without being copied
+    data = np.empty((num_events, len(columns)), dtype=dtype, order="F")
+    for i, (_, column) in enumerate(columns):
+        # Each channel is read out of the read-only memory map and cast to dtype in one pass as it is assigned
+        data[:, i] = column
+    return data
+
+
+def _fcs_to_df(FCSdata, channels=None):
+    """
+    Converts data values and keys (channel names) of a convertFCS object to a PANDAS dataframe
+    :param FCSdata: convertFCS object holding data from an FCS file
+    :param channels: optional list of channel names to convert; only these channels are cast and copied into the dataframe
+    :return: PANDAS dataframe object
+    """
+    # $DATATYPE='I' data is already integer, so only float data needs casting
+    cast_to_int = FCSdata.text_keywords["$DATATYPE"] != "I"
+    # Channels are paired with their record fields by position, so channels sharing a $PnN name each keep their column
+    columns = list(zip(FCSdata.channel_names, FCSdata.records.dtype.names))
+    if channels is not None:
+        # Keep only the requested channels so unused channels are never cast or copied
+        # Events interleave every channel within far less than a page, so all of $DATA is still read from disk
+        positions = {}
+        for channel, field in columns:
+            positions.setdefault(channel, []).append(field)
+        columns = [
+            (channel, field) for channel in channels for field in positions[channel]
+        ]
+    columns = [(channel, FCSdata.records[field]) for channel, field in columns]
+    if not columns:
+        # No channels selected: nothing to cast, so return an empty frame with one row per event
+        return pd.DataFrame(index=pd.RangeIndex(len(FCSdata.records)))
+    num_events = len(FCSdata.records)
+    # When every channel is converted and they share a dtype, cast the 2D view of the records rather than each field
+    stacked = FCSdata._data if channels is None else None
+    if cast_to_int:
+        # Clean up the data by converting to int since values after decimal won't change the analysis
+        # Casting NaN, inf or out of range floats to int silently produces garbage, so have NumPy raise on them instead
+        # int32 covers cytometer channel ranges at half the memory of int64, so it is tried first
+        try:
+            with np.errstate(invalid="raise"):
+                data = _stack_columns(columns, num_events, np.int32, stacked)
+        except FloatingPointError:
+            # Only unusual data gets here, so the channels are scanned for the culprit now rather than on every call
+            for channel, column in columns:
+                if not np.isfinite(column).all():
+                    raise ValueError(
+                        f"Cannot convert non-finite values (NaN or inf) in channel {channel} to integer"
+                    ) from None
+            # All values are finite, so some are beyond the int32 range; fall back to int64
+            try:
+                with np.errstate(invalid="raise"):
+                    data = _stack_columns(columns, num_events, np.int64, stacked)
+            except FloatingPointError:
+                raise ValueError(
+                    "Cannot convert values beyond the int64 range to integer"
+                ) from None
+    else:
+        # Cast to a signed type so arithmetic between channels (e.g. background subtraction) can go negative
+        # int32 holds any unsigned value of up to 16 bits ($PnB), while wider channels need int64
+        dtype = (
+            np.int32
+            if all(column.dtype.itemsize <= 2 for _, column in columns)
+            else np.int64
+        )
+        data = _stack_columns(columns, num_events, dtype, stacked)
     # Convert the cleaned FCS data into a PANDAS dataframe
-    # Clean up the df by converting to int since values after decimal won't change the analysis
-    df = pd.DataFrame(FCSdata.data, columns=FCSdata.channel_names).astype(int)
+    df = pd.DataFrame(data, columns=[channel for channel, _ in columns], copy=False)
     return df
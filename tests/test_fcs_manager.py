@@ -0,0 +1,371 @@
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+import fcs_manager
+
+
+def make_dataset(
+    channels,
+    datatype="F",
+    byteord="1,2,3,4",
+    delim=b"/",
+    extra=None,
+    last=True,
+    zero_data_offsets=False,
+):
+    """
+    Builds the bytes of one FCS3.0 data set (HEADER, $TEXT and $DATA segments)
+    :param channels: dict (or list of pairs, to repeat a name) of channel name to 1D NumPy array holding that channel's events
+    :param datatype: $DATATYPE keyword
+    :param byteord: $BYTEORD keyword
+    :param delim: $TEXT delimiter
+    :param extra: dict of additional $TEXT keywords
+    :param last: if False, $NEXTDATA points just past this data set's $DATA segment
+    :param zero_data_offsets: write 0 for the $DATA offsets in the HEADER, as done for very large files
+    :return: bytes of the data set
+    """
+    endian = "<" if byteord.startswith("1") else ">"
+    channels = list(channels.items() if isinstance(channels, dict) else channels)
+    columns = [column for _, column in channels]
+    records = np.empty(
+        len(columns[0]),
+        dtype=[
+            (f"f{i}", column.dtype.newbyteorder(endian))
+            for i, column in enumerate(columns)
+        ],
+    )
+    for i, column in enumerate(columns):
+        records[f"f{i}"] = column
+    data = records.tobytes()
+
+    keywords = {
+        "$BYTEORD": byteord,
+        "$DATATYPE": datatype,
+        "$MODE": "L",
+        "$PAR": str(len(columns)),
+        "$TOT": str(len(columns[0])),
+    }
+    for i, (name, column) in enumerate(channels, 1):
+        keywords[f"$P{i}N"] = name
+        keywords[f"$P{i}B"] = str(column.dtype.itemsize * 8)
+        keywords[f"$P{i}R"] = "1024"
+    keywords.update(extra or {})
+
+    def build_text(begin_data):
+        text_keywords = dict(
+            keywords,
+            **{
+                "$BEGINDATA": str(begin_data),
+                "$ENDDATA": str(begin_data + len(data) - 1),
+                "$NEXTDATA": "0" if last else str(begin_data + len(data)),
+            },
+        )
+        text = delim
+        for key, value in text_keywords.items():
+            for token in (key, value):
+                text += token.encode().replace(delim, delim * 2) + delim
+        return text
+
+    # Offsets are written into $TEXT itself, so grow $BEGINDATA until the $TEXT length settles
+    begin_data = 58
+    while 58 + len(build_text(begin_data)) != begin_data:
+        begin_data = 58 + len(build_text(begin_data))
+    text = build_text(begin_data)
+
+    data_offsets = (
+        (0, 0) if zero_data_offsets else (begin_data, begin_data + len(data) - 1)
+    )
+    header = b"FCS3.0    " + b"".join(
+        str(offset).rjust(8).encode()
+        for offset in (58, 58 + len(text) - 1, *data_offsets, 0, 0)
+    )
+    return header + text + data
+
+
+def write_fcs(path, *datasets):
+    path.write_bytes(b"".join(datasets))
+    return str(path)
+
+
+@pytest.fixture
+def float_channels():
+    rng = np.random.default_rng(0)
+    return {
+        name: (rng.random(100) * 1000).astype(np.float32)
+        for name in ("FSC-A", "SSC-A", "FL1-A")
+    }
+
+
+def test_convertDF_float_data(tmp_path, float_channels):
+    path = write_fcs(tmp_path / "float.fcs", make_dataset(float_channels))
+    df = fcs_manager.convertDF(path)
+    assert list(df.columns) == list(float_channels)
+    for name, column in float_channels.items():
+        np.testing.assert_array_equal(df[name], column.astype(np.int64))
+
+
+def test_big_endian_data(tmp_path, float_channels):
+    path = write_fcs(
+        tmp_path / "big.fcs", make_dataset(float_channels, byteord="4,3,2,1")
+    )
+    FCSdata = fcs_manager.convertFCS(path, 0)
+    assert FCSdata.byte_order == ">"
+    np.testing.assert_array_equal(
+        FCSdata.data, np.column_stack(list(float_channels.values()))
+    )
+
+
+def test_mixed_channel_widths(tmp_path):
+    channels = {
+        "FSC-A": np.arange(10, dtype=np.uint16),
+        "SSC-A": np.arange(10, 20, dtype=np.uint16),
+        "Time": np.arange(70000, 70010, dtype=np.uint32),
+    }
+    path = write_fcs(
+        tmp_path / "mixed.fcs",
+        make_dataset(channels, datatype="I", byteord="4,3,2,1"),
+    )
+    FCSdata = fcs_manager.convertFCS(path, 0)
+    assert FCSdata.channel_bits == [16, 16, 32]
+    np.testing.assert_array_equal(
+        FCSdata.data, np.column_stack(list(channels.values()))
+    )
+    df = fcs_manager.convertDF(path)
+    for name, column in channels.items():
+        np.testing.assert_array_equal(df[name], column)
+
+
+def test_escaped_delimiters(tmp_path, float_channels):
+    channels = {
+        "FL1/A" if name == "FL1-A" else name: column
+        for name, column in float_channels.items()
+    }
+    path = write_fcs(
+        tmp_path / "escaped.fcs",
+        make_dataset(channels, extra={"$SPILL": "a//b", "NOTE": "x/y/"}),
+    )
+    FCSdata = fcs_manager.convertFCS(path, 0)
+    assert FCSdata.channel_names == ["FSC-A", "SSC-A", "FL1/A"]
+    assert FCSdata.text_keywords["$SPILL"] == "a//b"
+    assert FCSdata.text_keywords["NOTE"] == "x/y/"
+
+
+@pytest.mark.parametrize("zero_data_offsets", [False, True])
+def test_multi_sample_file(tmp_path, zero_data_offsets):
+    rng = np.random.default_rng(1)
+    samples = [
+        {name: (rng.random(50 + i) * 100).astype(np.float32) for name in ("A", "B")}
+        for i in range(3)
+    ]
+    path = write_fcs(
+        tmp_path / "multi.fcs",
+        *(
+            make_dataset(
+                sample,
+                last=i == len(samples) - 1,
+                zero_data_offsets=zero_data_offsets,
+            )
+            for i, sample in enumerate(samples)
+        ),
+    )
+
+    for i, sample in enumerate(samples):
+        df = fcs_manager.convertDF(path, i)
+        np.testing.assert_array_equal(df["A"], sample["A"].astype(np.int64))
+    for df, sample in zip(fcs_manager.convertAllDF(path), samples):
+        np.testing.assert_array_equal(df["B"], sample["B"].astype(np.int64))
+
+    with pytest.raises(NameError):
+        fcs_manager.convertDF(path, len(samples))
+
+
+def test_metadata_cache_hit_and_rewritten_file(tmp_path, float_channels):
+    path = write_fcs(tmp_path / "cached.fcs", make_dataset(float_channels))
+    fcs_manager.convertFCS(path, 0)
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, 0)
+    assert cache_key in fcs_manager._METADATA_CACHE
+
+    # A cache hit must not share mutable containers with the cache
+    FCSdata = fcs_manager.convertFCS(path, 0)
+    FCSdata.channel_names.append("changed")
+    assert fcs_manager.convertFCS(path, 0).channel_names == list(float_channels)
+
+    # Rewriting the file with different channels must not reuse its stale metadata
+    renamed = {f"{name}-H": column[:10] for name, column in float_channels.items()}
+    write_fcs(tmp_path / "cached.fcs", make_dataset(renamed))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    df = fcs_manager.convertDF(path)
+    assert list(df.columns) == list(renamed)
+    assert len(df) == 10
+
+
+def test_buffer_input(tmp_path, float_channels):
+    dataset = make_dataset(float_channels)
+    path = write_fcs(tmp_path / "buffer.fcs", dataset)
+    expected = fcs_manager.convertFCS(path, 0).data
+    for buffer in (dataset, bytearray(dataset), memoryview(dataset)):
+        FCSdata = fcs_manager.convertFCS(buffer, 0)
+        np.testing.assert_array_equal(FCSdata.data, expected)
+        assert not FCSdata.data.flags.writeable
+    np.testing.assert_array_equal(
+        fcs_manager.convertFCS.from_buffer(dataset).data, expected
+    )
+
+
+def test_channels_selection(tmp_path, float_channels):
+    path = write_fcs(tmp_path / "channels.fcs", make_dataset(float_channels))
+    df = fcs_manager.convertDF(path, channels=["FL1-A", "FSC-A"])
+    assert list(df.columns) == ["FL1-A", "FSC-A"]
+    np.testing.assert_array_equal(df["FL1-A"], float_channels["FL1-A"].astype(np.int64))
+
+
+@pytest.mark.parametrize("bad_value", [np.nan, np.inf, -np.inf])
+def test_non_finite_float_data_raises(tmp_path, float_channels, bad_value):
+    float_channels["SSC-A"][3] = bad_value
+    path = write_fcs(tmp_path / "non_finite.fcs", make_dataset(float_channels))
+    with pytest.raises(ValueError):
+        fcs_manager.convertDF(path)
+
+
+def test_float_data_beyond_int32_range(tmp_path):
+    channels = {"A": np.array([1.5, 3e9, -3e9, 7.0])}
+    path = write_fcs(tmp_path / "wide.fcs", make_dataset(channels, datatype="D"))
+    df = fcs_manager.convertDF(path)
+    np.testing.assert_array_equal(df["A"], [1, 3_000_000_000, -3_000_000_000, 7])
+
+
+def test_float_data_beyond_int64_range_raises(tmp_path):
+    channels = {"A": np.array([1.5, 1e20])}
+    path = write_fcs(tmp_path / "huge.fcs", make_dataset(channels, datatype="D"))
+    with pytest.raises(ValueError):
+        fcs_manager.convertDF(path)
+
+
+def test_integer_data_is_signed(tmp_path):
+    channels = {
+        "A": np.array([1, 5], dtype=np.uint16),
+        "B": np.array([3, 2], dtype=np.uint16),
+        "Time": np.array([2**32 - 1, 0], dtype=np.uint32),
+    }
+    path = write_fcs(tmp_path / "signed.fcs", make_dataset(channels, datatype="I"))
+    df = fcs_manager.convertDF(path)
+    np.testing.assert_array_equal(df["A"] - df["B"], [-2, 3])
+    assert df["Time"].iloc[0] == 2**32 - 1
+    assert fcs_manager.convertDF(path, channels=["A", "B"])["A"].dtype == np.int32
+
+
+@pytest.mark.parametrize("datatype, dtype", [("F", np.float32), ("I", np.uint16)])
+def test_empty_channels_selection(tmp_path, datatype, dtype):
+    channels = {"A": np.arange(5).astype(dtype), "B": np.arange(5).astype(dtype)}
+    path = write_fcs(tmp_path / "empty.fcs", make_dataset(channels, datatype=datatype))
+    df = fcs_manager.convertDF(path, channels=[])
+    assert df.shape == (5, 0)
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "posix_fadvise") or not os.path.exists("/proc/self/maps"),
+    reason="needs posix_fadvise and /proc/self/maps",
+)
+def test_drop_page_cache(tmp_path, float_channels, monkeypatch):
+    path = write_fcs(tmp_path / "dropped.fcs", make_dataset(float_channels))
+    advised = []
+
+    def posix_fadvise(fd, offset, length, advice):
+        # Record each hint along with whether the file was still mapped when it was given
+        with open("/proc/self/maps") as maps:
+            advised.append((advice, path in maps.read()))
+
+    monkeypatch.setattr(os, "posix_fadvise", posix_fadvise)
+    fcs_manager.convertDF(path)
+    assert (os.POSIX_FADV_DONTNEED, False) not in advised
+    df = fcs_manager.convertDF(path, drop_page_cache=True)
+    np.testing.assert_array_equal(df["FSC-A"], float_channels["FSC-A"].astype(np.int64))
+    # The kernel keeps mapped pages resident, so the file must be unmapped by the time DONTNEED is given
+    assert advised[-1] == (os.POSIX_FADV_DONTNEED, False)
+
+
+def test_duplicate_channel_names(tmp_path):
+    channels = [
+        ("FSC-A", np.arange(4, dtype=np.float32)),
+        ("SSC-A", np.arange(4, 8, dtype=np.float32)),
+        ("FSC-A", np.arange(8, 12, dtype=np.float32)),
+    ]
+    path = write_fcs(tmp_path / "duplicates.fcs", make_dataset(channels))
+
+    FCSdata = fcs_manager.convertFCS(path, 0)
+    assert FCSdata.channel_names == ["FSC-A", "SSC-A", "FSC-A"]
+    np.testing.assert_array_equal(FCSdata.columns["FSC-A"], np.arange(4))
+    df = fcs_manager.convertDF(path)
+    assert list(df.columns) == ["FSC-A", "SSC-A", "FSC-A"]
+    np.testing.assert_array_equal(df.iloc[:, 2], np.arange(8, 12))
+    df = fcs_manager.convertDF(path, channels=["FSC-A"])
+    np.testing.assert_array_equal(df.to_numpy(), [[0, 8], [1, 9], [2, 10], [3, 11]])
+    with pytest.raises(KeyError):
+        fcs_manager.convertDF(path, channels=["FL1-A"])
+
+
+def test_convertManyFCS_accepts_pathlib_paths(tmp_path, float_channels):
+    paths = [tmp_path / f"{i}.fcs" for i in range(3)]
+    for path in paths:
+        write_fcs(path, make_dataset(float_channels))
+    for FCSdata in fcs_manager.convertManyFCS(paths):
+        assert FCSdata.channel_names == list(float_channels)
+
+
+def test_metadata_cache_is_bounded_under_threads(tmp_path, float_channels, monkeypatch):
+    monkeypatch.setattr(fcs_manager, "_METADATA_CACHE", OrderedDict())
+    monkeypatch.setattr(fcs_manager, "_METADATA_CACHE_SIZE", 4)
+    paths = [tmp_path / f"{i}.fcs" for i in range(32)]
+    for path in paths:
+        write_fcs(path, make_dataset(float_channels))
+    fcs_manager.convertManyFCS(paths, max_workers=8)
+    assert len(fcs_manager._METADATA_CACHE) == 4
+
+
+def test_metadata_cache_evicts_least_recently_used(
+    tmp_path, float_channels, monkeypatch
+):
+    monkeypatch.setattr(fcs_manager, "_METADATA_CACHE", OrderedDict())
+    monkeypatch.setattr(fcs_manager, "_METADATA_CACHE_SIZE", 2)
+    paths = {name: tmp_path / f"{name}.fcs" for name in "ABC"}
+    for path in paths.values():
+        write_fcs(path, make_dataset(float_channels))
+    for name in "ABAC":
+        fcs_manager.convertFCS(paths[name], 0)
+    cached = {cache_key[0] for cache_key in fcs_manager._METADATA_CACHE}
+    assert cached == {str(paths["A"]), str(paths["C"])}
+
+
+def test_pickle_round_trip(tmp_path, float_channels):
+    dataset = make_dataset(float_channels)
+    path = write_fcs(tmp_path / "pickled.fcs", dataset)
+    for FCSdata in (
+        fcs_manager.convertFCS(path, 0),
+        fcs_manager.convertFCS.from_buffer(dataset),
+    ):
+        restored = pickle.loads(pickle.dumps(FCSdata))
+        assert restored.channel_names == FCSdata.channel_names
+        assert restored.text_keywords == FCSdata.text_keywords
+        np.testing.assert_array_equal(restored.data, FCSdata.data)
+        np.testing.assert_array_equal(
+            restored.columns["FL1-A"], float_channels["FL1-A"]
+        )
+
+
+def test_unpickling_a_rewritten_file_raises(tmp_path, float_channels):
+    path = write_fcs(tmp_path / "rewritten.fcs", make_dataset(float_channels))
+    pickled = pickle.dumps(fcs_manager.convertFCS(path, 0))
+    stat = os.stat(path)
+    renamed = {
+        f"{name}-H": column.astype(np.float64)
+        for name, column in float_channels.items()
+    }
+    write_fcs(tmp_path / "rewritten.fcs", make_dataset(renamed, datatype="D"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    with pytest.raises(ValueError):
+        pickle.loads(pickled)